@@ -0,0 +1,63 @@
+"""
+Import-time benchmark: measures `import rocketapi` and client imports in fresh interpreters,
+and fails if they get slower than the limits or pull in heavy modules.
+
+Usage:
+    python benchmarks/import_time.py [--runs 10] [--max-ms 50]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STATEMENTS = {
+    "import rocketapi": [],
+    "from rocketapi import InstagramAPI, ThreadsAPI": ["requests", "http.client", "ssl", "sqlite3"],
+}
+
+SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"ms": elapsed * 1000, "modules": sorted(sys.modules)}}))
+"""
+
+
+def measure(statement):
+    output = subprocess.check_output(
+        [sys.executable, "-c", SCRIPT.format(statement=statement)],
+        cwd=ROOT,
+        env=dict(os.environ, PYTHONDONTWRITEBYTECODE="1"),
+    )
+    return json.loads(output)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--max-ms", type=float, default=50.0)
+    args = parser.parse_args()
+
+    failed = False
+    for statement, forbidden in STATEMENTS.items():
+        results = [measure(statement) for _ in range(args.runs)]
+        median = statistics.median(result["ms"] for result in results)
+        imported = sorted(set(forbidden) & set(results[0]["modules"]))
+        print(f"{statement}: {median:.1f} ms (median of {args.runs})")
+        if imported:
+            print(f"  FAIL: imports {', '.join(imported)}")
+            failed = True
+        if median > args.max_ms:
+            print(f"  FAIL: slower than {args.max_ms:.0f} ms")
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,2 +1,14 @@
-from .instagramapi import InstagramAPI
-from .threadsapi import ThreadsAPI
+__all__ = ["InstagramAPI", "ThreadsAPI"]
+
+
+def __getattr__(name):
+    # The clients are imported on first access, so `import rocketapi` stays cheap
+    if name == "InstagramAPI":
+        from .instagramapi import InstagramAPI
+
+        return InstagramAPI
+    if name == "ThreadsAPI":
+        from .threadsapi import ThreadsAPI
+
+        return ThreadsAPI
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,167 @@
+from array import array
+
+from rocketapi.utils import entity_id, find_media
+
+
+class Field:
+    def __init__(self, name, paths, kind="float"):
+        """
+        Column of a schema.
+
+        Args:
+            name (str): Column name
+            paths (list): Paths (tuples of keys) to the value in a media object, tried in order
+            kind (str): "int" (int64, -1 if missing), "float" (float64, NaN if missing) or "str" (None if missing)
+        """
+        self.name = name
+        self.paths = [tuple(path) for path in paths]
+        self.kind = kind
+
+    def get(self, item):
+        for path in self.paths:
+            value = item
+            for key in path:
+                if not isinstance(value, dict):
+                    value = None
+                    break
+                value = value.get(key)
+            if value is not None:
+                return value
+        return None
+
+
+INSTAGRAM_MEDIA_SCHEMA = [
+    Field("id", [("pk",), ("id",)], "int"),
+    Field("code", [("code",), ("shortcode",)], "str"),
+    Field("user_id", [("user", "pk"), ("user", "id"), ("owner", "id")], "int"),
+    Field("media_type", [("media_type",)], "int"),
+    Field("taken_at", [("taken_at",), ("taken_at_timestamp",)], "int"),
+    Field("like_count", [("like_count",), ("edge_liked_by", "count")]),
+    Field("comment_count", [("comment_count",), ("edge_media_to_comment", "count")]),
+    Field("play_count", [("play_count",), ("ig_play_count",), ("video_view_count",)]),
+    Field("view_count", [("view_count",), ("video_view_count",)]),
+]
+
+THREADS_POST_SCHEMA = [
+    Field("id", [("pk",), ("id",)], "int"),
+    Field("code", [("code",)], "str"),
+    Field("user_id", [("user", "pk"), ("user", "id")], "int"),
+    Field("taken_at", [("taken_at",)], "int"),
+    Field("like_count", [("like_count",)]),
+    Field("reply_count", [("text_post_app_info", "direct_reply_count")]),
+    Field("repost_count", [("text_post_app_info", "repost_count")]),
+    Field("quote_count", [("text_post_app_info", "quote_count")]),
+]
+
+SCHEMAS = {
+    "instagram/user/get_media": INSTAGRAM_MEDIA_SCHEMA,
+    "instagram/user/get_media_by_username": INSTAGRAM_MEDIA_SCHEMA,
+    "instagram/user/get_clips": INSTAGRAM_MEDIA_SCHEMA,
+    "instagram/hashtag/get_media": INSTAGRAM_MEDIA_SCHEMA,
+    "instagram/location/get_media": INSTAGRAM_MEDIA_SCHEMA,
+    "threads/user/get_feed": THREADS_POST_SCHEMA,
+}
+
+_MISSING = {"int": -1, "float": float("nan"), "str": None}
+
+
+def _to_number(value, kind):
+    if value is None:
+        return _MISSING[kind]
+    try:
+        if kind == "int":
+            return int(str(value).split("_")[0])
+        return float(value)
+    except (TypeError, ValueError):
+        return _MISSING[kind]
+
+
+class ColumnarBuilder:
+    def __init__(self, schema):
+        """
+        Converts pages of media into columns, one page at a time, so raw pages do not need to be kept.
+
+        Both API media objects and GraphQL media nodes (`shortcode`, `taken_at_timestamp`, `edge_liked_by`...) are read.
+        Numeric columns are stored in stdlib arrays (int64 or float64), string columns in lists.
+        Use `to_numpy` or `to_dataframe` if NumPy or pandas are installed.
+
+        Args:
+            schema (list): List of `Field`, or an endpoint path (see `SCHEMAS`)
+
+        Example:
+            builder = ColumnarBuilder("instagram/user/get_media")
+            max_id = None
+            while True:
+                page = api.get_user_media(user_id, max_id=max_id)
+                builder.add_page(page)
+                max_id = page.get("next_max_id")
+                if not max_id:
+                    break
+            df = builder.to_dataframe()
+        """
+        if isinstance(schema, str):
+            schema = SCHEMAS[schema]
+        self.schema = schema
+        self.columns = {
+            field.name: [] if field.kind == "str" else array("q" if field.kind == "int" else "d")
+            for field in schema
+        }
+        self._seen = set()
+
+    def __len__(self):
+        return len(self.columns[self.schema[0].name]) if self.schema else 0
+
+    def add_page(self, body, deduplicate=True):
+        """
+        Append the media of a response body.
+
+        Args:
+            body (dict): Response body
+            deduplicate (bool): Skip media already added (by media id; media without an id are always added)
+
+        Returns the number of rows added.
+        """
+        added = 0
+        columns = [(field, self.columns[field.name]) for field in self.schema]
+        for item in find_media(body, graphql=True):
+            if deduplicate and (item.get("pk") is not None or item.get("id") is not None):
+                key = entity_id(item)
+                if key in self._seen:
+                    continue
+                self._seen.add(key)
+            for field, column in columns:
+                value = field.get(item)
+                column.append(value if field.kind == "str" else _to_number(value, field.kind))
+            added += 1
+        return added
+
+    def add_pages(self, pages, deduplicate=True):
+        """Append the media of every response body of an iterable, one page at a time."""
+        for body in pages:
+            self.add_page(body, deduplicate=deduplicate)
+        return self
+
+    def to_dict(self):
+        """Return the columns (stdlib arrays and lists), keyed by name."""
+        return dict(self.columns)
+
+    def to_numpy(self):
+        """Return the columns as NumPy arrays (int64, float64 or object), keyed by name. Requires NumPy."""
+        import numpy
+
+        result = {}
+        for field in self.schema:
+            column = self.columns[field.name]
+            if field.kind == "str":
+                result[field.name] = numpy.array(column, dtype=object)
+            else:
+                # Copy, so the stdlib array can still grow after the conversion
+                dtype = numpy.int64 if field.kind == "int" else numpy.float64
+                result[field.name] = numpy.frombuffer(column, dtype=dtype).copy()
+        return result
+
+    def to_dataframe(self):
+        """Return the columns as a pandas DataFrame. Requires pandas."""
+        import pandas
+
+        return pandas.DataFrame(self.to_numpy(), columns=[field.name for field in self.schema])
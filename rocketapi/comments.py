@@ -0,0 +1,345 @@
+import contextvars
+import heapq
+import itertools
+import queue
+import threading
+
+from rocketapi.exceptions import NotFoundException
+from rocketapi.utils import thread_replies
+
+
+_DONE = object()
+_FIRST = float("-inf")
+
+
+class _TreeWalker:
+    def __init__(self, max_workers):
+        self._max_workers = max_workers
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._pending = 0
+        self._stopped = False
+        self._seen = set()
+        self._rows = queue.Queue()
+
+    def submit(self, priority, fn, *args, report=None):
+        """
+        Schedule a task; tasks with a lower priority value run first.
+
+        An exception raised by a task stops the walk, unless `report` is set to a `(part, parent_id)` tuple:
+        the exception is then emitted as an "error" row and the walk goes on.
+        """
+        with self._cond:
+            if self._stopped:
+                return
+            self._pending += 1
+            heapq.heappush(self._heap, (priority, next(self._seq), contextvars.copy_context(), report, fn, args))
+            self._cond.notify()
+
+    def emit(self, row):
+        self._rows.put(row)
+
+    def claim(self, row_id):
+        """Return True the first time it is called for an id, False afterwards."""
+        with self._cond:
+            if row_id in self._seen:
+                return False
+            self._seen.add(row_id)
+            return True
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._heap and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                _, _, context, report, fn, args = heapq.heappop(self._heap)
+            try:
+                context.run(fn, *args)
+            except Exception as e:
+                if report is None:
+                    self._rows.put(e)
+                    self._stop()
+                else:
+                    part, parent_id = report
+                    self._rows.put(_row("error", part, parent_id, e))
+            with self._cond:
+                self._pending -= 1
+                if self._pending == 0:
+                    self._rows.put(_DONE)
+
+    def _stop(self):
+        with self._cond:
+            self._stopped = True
+            self._heap = []
+            self._cond.notify_all()
+
+    def run(self, priority, fn, *args):
+        self.submit(priority, fn, *args)
+        workers = [threading.Thread(target=self._worker, daemon=True) for _ in range(self._max_workers)]
+        for worker in workers:
+            worker.start()
+        try:
+            while True:
+                row = self._rows.get()
+                if row is _DONE:
+                    return
+                if isinstance(row, Exception):
+                    raise row
+                yield row
+        finally:
+            self._stop()
+
+
+def _row(row_type, row_id, parent_id, data):
+    return {"type": row_type, "id": row_id, "parent_id": parent_id, "data": data}
+
+
+def build_tree(rows):
+    """
+    Build a comment tree from the rows yielded by `iter_comments` / `iter_replies`.
+
+    Returns the list of top-level nodes. Every node is a dict with `id`, `data`, `replies`, `likes` and `errors` keys
+    (`errors` maps "replies" / "likes" to the exception that stopped fetching them).
+    Rows may come in any order, replies to unknown parents are dropped.
+    """
+    nodes = {}
+    children = {}
+    likes = {}
+    errors = {}
+    for row in rows:
+        if row["type"] == "like":
+            likes.setdefault(row["parent_id"], []).append(row["data"])
+        elif row["type"] == "error":
+            errors.setdefault(row["parent_id"], {})[row["id"]] = row["data"]
+        else:
+            nodes[row["id"]] = {"id": row["id"], "data": row["data"], "replies": [], "likes": []}
+            children.setdefault(row["parent_id"], []).append(row["id"])
+
+    for node_id, node in nodes.items():
+        node["replies"] = [nodes[child_id] for child_id in children.get(node_id, [])]
+        node["likes"] = likes.get(node_id, [])
+        node["errors"] = errors.get(node_id, {})
+    return [nodes[node_id] for node_id in children.get(None, [])]
+
+
+class CommentTreeFetcher:
+    def __init__(self, api, max_workers=8, with_likes=False, max_pages=None):
+        """
+        Fetches full comment trees of Instagram media.
+
+        Comment pages are requested one after another, and reply (and, optionally, like) fetches of every comment
+        start as soon as the page containing it arrives. Threads with more replies are fetched first.
+
+        Args:
+            api (InstagramAPI): Client to use (it can be shared with other threads)
+            max_workers (int): Maximum number of concurrent requests
+            with_likes (bool): Also fetch comment likes (`get_comment_likes`)
+            max_pages (int): Maximum number of pages to fetch per comment list (default: no limit)
+        """
+        self.api = api
+        self.max_workers = max_workers
+        self.with_likes = with_likes
+        self.max_pages = max_pages
+
+    def iter_comments(self, media_id):
+        """
+        Stream the comment tree of a media as flat rows, in the order they arrive.
+
+        Every row is a dict:
+            type (str): "comment" for comments and replies, "like" for comment likes,
+                "error" for a reply or like list of a comment that could not be fetched
+            id: comment pk (or user pk for likes, "replies" / "likes" for errors)
+            parent_id: parent comment pk (None for top-level comments)
+            data (dict): comment (or user) object as returned by the API, or the exception for errors
+
+        Failing to fetch the top-level comments raises; failing to fetch the replies or likes of a comment only
+        yields an "error" row.
+
+        Use `build_tree` to turn the rows into a nested tree.
+
+        Args:
+            media_id (int): Media id
+        """
+        walker = _TreeWalker(self.max_workers)
+        return walker.run(_FIRST, self._comments_page, walker, media_id, None, 1)
+
+    def fetch_tree(self, media_id):
+        """
+        Fetch the comment tree of a media. See `build_tree` for the result format.
+
+        Args:
+            media_id (int): Media id
+        """
+        return build_tree(self.iter_comments(media_id))
+
+    def _has_more(self, page, cursor):
+        return cursor and (self.max_pages is None or page < self.max_pages)
+
+    def _comment(self, walker, parent_id, comment):
+        walker.emit(_row("comment", comment.get("pk"), parent_id, comment))
+        if self.with_likes and comment.get("comment_like_count"):
+            priority = -comment["comment_like_count"]
+            walker.submit(
+                priority, self._likes_page, walker, priority, comment["pk"], None, 1, report=("likes", comment["pk"])
+            )
+
+    def _comments_page(self, walker, media_id, min_id, page):
+        response = self.api.get_media_comments(media_id, min_id=min_id)
+        cursor = response.get("next_min_id")
+        if self._has_more(page, cursor):
+            walker.submit(_FIRST, self._comments_page, walker, media_id, cursor, page + 1)
+        for comment in response.get("comments") or []:
+            self._comment(walker, None, comment)
+            if comment.get("child_comment_count"):
+                priority = -comment["child_comment_count"]
+                walker.submit(
+                    priority,
+                    self._replies_page,
+                    walker,
+                    priority,
+                    media_id,
+                    comment["pk"],
+                    None,
+                    1,
+                    report=("replies", comment["pk"]),
+                )
+
+    def _replies_page(self, walker, priority, media_id, comment_id, max_id, page):
+        try:
+            response = self.api.get_comment_replies(comment_id, media_id, max_id=max_id)
+        except NotFoundException:
+            return
+        cursor = response.get("next_max_child_cursor") if response.get("has_more_tail_child_comments", True) else None
+        if self._has_more(page, cursor):
+            walker.submit(
+                priority,
+                self._replies_page,
+                walker,
+                priority,
+                media_id,
+                comment_id,
+                cursor,
+                page + 1,
+                report=("replies", comment_id),
+            )
+        for comment in response.get("child_comments") or []:
+            self._comment(walker, comment_id, comment)
+
+    def _likes_page(self, walker, priority, comment_id, max_id, page):
+        try:
+            response = self.api.get_comment_likes(comment_id, max_id=max_id)
+        except NotFoundException:
+            return
+        cursor = response.get("next_max_id")
+        if self._has_more(page, cursor):
+            walker.submit(
+                priority, self._likes_page, walker, priority, comment_id, cursor, page + 1, report=("likes", comment_id)
+            )
+        for user in response.get("users") or []:
+            walker.emit(_row("like", user.get("pk"), comment_id, user))
+
+
+def _thread_replies_page(response):
+    reply_threads, cursor = thread_replies(response)
+    # Every reply thread is a chain: each item replies to the previous one
+    chains = []
+    for reply_thread in reply_threads:
+        chain = [item["post"] for item in reply_thread.get("thread_items") or [] if item.get("post")]
+        if chain:
+            chains.append(chain)
+    return chains, cursor
+
+
+class ThreadReplyTreeFetcher:
+    def __init__(self, api, max_workers=8, max_depth=None, max_pages=None):
+        """
+        Fetches full reply trees of Threads posts.
+
+        Reply fetches of every reply start as soon as the page containing it arrives.
+        Replies with more direct replies are fetched first.
+
+        Args:
+            api (ThreadsAPI): Client to use (it can be shared with other threads)
+            max_workers (int): Maximum number of concurrent requests
+            max_depth (int): Maximum reply depth to fetch (default: no limit)
+            max_pages (int): Maximum number of pages to fetch per reply list (default: no limit)
+        """
+        self.api = api
+        self.max_workers = max_workers
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+
+    def iter_replies(self, thread_id):
+        """
+        Stream the reply tree of a thread as flat rows, in the order they arrive.
+
+        Every row is a dict:
+            type (str): "comment", or "error" for a reply list that could not be fetched
+            id: post pk ("replies" for errors)
+            parent_id: parent post pk (None for direct replies to the thread)
+            data (dict): post object as returned by the API, or the exception for errors
+
+        Every post is yielded once. Failing to fetch the direct replies of the thread raises; failing to fetch
+        the replies of a reply only yields an "error" row.
+
+        Use `build_tree` to turn the rows into a nested tree.
+
+        Args:
+            thread_id (int): Thread id
+        """
+        walker = _TreeWalker(self.max_workers)
+        return walker.run(_FIRST, self._replies_page, walker, _FIRST, thread_id, None, None, 1, 1)
+
+    def fetch_tree(self, thread_id):
+        """
+        Fetch the reply tree of a thread. See `build_tree` for the result format.
+
+        Args:
+            thread_id (int): Thread id
+        """
+        return build_tree(self.iter_replies(thread_id))
+
+    def _replies_page(self, walker, priority, thread_id, parent_id, max_id, page, depth):
+        try:
+            response = self.api.get_thread_replies(thread_id, max_id=max_id)
+        except NotFoundException:
+            if parent_id is None:
+                raise
+            return
+        chains, cursor = _thread_replies_page(response)
+        if cursor and (self.max_pages is None or page < self.max_pages):
+            report = None if parent_id is None else ("replies", parent_id)
+            walker.submit(
+                priority, self._replies_page, walker, priority, thread_id, parent_id, cursor, page + 1, depth, report=report
+            )
+        for chain in chains:
+            chain_parent_id = parent_id
+            for index, post in enumerate(chain):
+                post_depth = depth + index
+                if self.max_depth is not None and post_depth > self.max_depth:
+                    break
+                pk = post.get("pk")
+                if walker.claim(pk):
+                    walker.emit(_row("comment", pk, chain_parent_id, post))
+                    self._post_replies(walker, post, post_depth, in_chain=index + 1 < len(chain))
+                chain_parent_id = pk
+
+    def _post_replies(self, walker, post, depth, in_chain):
+        # The first reply may already be the next item of the chain
+        reply_count = (post.get("text_post_app_info") or {}).get("direct_reply_count") or 0
+        if reply_count > int(in_chain) and (self.max_depth is None or depth < self.max_depth):
+            walker.submit(
+                -reply_count,
+                self._replies_page,
+                walker,
+                -reply_count,
+                post["pk"],
+                post["pk"],
+                None,
+                1,
+                depth + 1,
+                report=("replies", post["pk"]),
+            )
@@ -0,0 +1,149 @@
+import threading
+
+from rocketapi.utils import entity_id as _entity_id
+
+
+_RELATIONS = {
+    # method: (relation, list field, direction) - "in" means (item, payload id), "out" means (payload id, item)
+    "instagram/user/get_followers": ("follows", "users", "in"),
+    "instagram/user/get_following": ("follows", "users", "out"),
+    "instagram/media/get_likes_by_id": ("likes", "users", "in"),
+    "instagram/media/get_comments": ("comments", "comments", "out"),
+    "instagram/comment/get_replies": ("replies", "child_comments", "out"),
+    "instagram/comment/get_likes": ("likes", "users", "in"),
+    "threads/user/get_followers": ("follows", "users", "in"),
+    "threads/user/get_following": ("follows", "users", "out"),
+    "threads/thread/get_likes": ("likes", "users", "in"),
+}
+
+
+def _compact(entity_id):
+    return int(entity_id) if entity_id.isdigit() else entity_id
+
+
+def _kind(value):
+    if value.get("pk") is None and value.get("id") is None:
+        return None
+    if "code" in value or "shortcode" in value:
+        return "media"
+    if "text" in value and "created_at" in value and isinstance(value.get("user"), dict):
+        return "comments"
+    if "username" in value:
+        return "users"
+    return None
+
+
+class EntityStore:
+    def __init__(self, mode="merge"):
+        """
+        Normalizing sink for API results.
+
+        Users, media and comments embedded in the responses are pulled out into keyed tables (`users`, `media`, `comments`)
+        and deduplicated by id. Inside the stored objects, embedded entities are replaced by their id.
+        Relationships are stored as (source id, target id) pairs in `relations`:
+            follows (follower, user), likes (user, media or comment), comments (media, comment),
+            replies (comment, reply), tagged (media, user), author (user, media or comment)
+
+        Attach the store to a client to fill it from every response:
+            store = EntityStore()
+            api = InstagramAPI(token)
+            api.entity_store = store
+
+        Args:
+            mode (str): "merge" to update stored objects with the new fields, "replace" to keep the last seen object only
+        """
+        if mode not in ("merge", "replace"):
+            raise ValueError("mode must be 'merge' or 'replace'")
+        self.mode = mode
+        self.users = {}
+        self.media = {}
+        self.comments = {}
+        self.relations = {}
+        self.seen = 0
+        self._found = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.users) + len(self.media) + len(self.comments)
+
+    def _table(self, kind):
+        return getattr(self, kind)
+
+    def _relate(self, relation, source, target):
+        self.relations.setdefault(relation, set()).add((_compact(source), _compact(target)))
+
+    def _normalize(self, value):
+        if isinstance(value, list):
+            return [self._normalize(item) for item in value]
+        if not isinstance(value, dict):
+            return value
+
+        kind = _kind(value)
+        fields = {}
+        for key, item in value.items():
+            normalized = self._normalize(item)
+            if kind is not None and isinstance(item, dict) and _kind(item) is not None:
+                if key == "user" or key == "owner":
+                    self._relate("author", normalized, _entity_id(value))
+            fields[key] = normalized
+        if kind is None:
+            return fields
+
+        entity_id = _entity_id(value)
+        if kind == "media":
+            for tag in (value.get("usertags") or {}).get("in") or []:
+                if isinstance(tag.get("user"), dict):
+                    self._relate("tagged", entity_id, _entity_id(tag["user"]))
+
+        self.seen += 1
+        self._found.append((kind, entity_id))
+        table = self._table(kind)
+        stored = table.get(entity_id)
+        if stored is None or self.mode == "replace":
+            table[entity_id] = fields
+        else:
+            stored.update((key, item) for key, item in fields.items() if item is not None)
+        return entity_id
+
+    def observe(self, platform, method, data, body):
+        """
+        Add the entities and relationships found in a response body.
+
+        Args:
+            platform (str): instagram or threads
+            method (str): API method the body was returned by
+            data (dict): Request payload
+            body (dict): Response body
+        """
+        with self._lock:
+            self._found = []
+            normalized = self._normalize(body)
+            if not isinstance(normalized, dict):
+                return
+
+            if method == "instagram/user/get_tags" and data.get("id") is not None:
+                for kind, media_id in self._found:
+                    if kind == "media":
+                        self._relate("tagged", media_id, str(data["id"]))
+
+            relation = _RELATIONS.get(method)
+            if relation is not None and data.get("id") is not None:
+                name, field, direction = relation
+                for item_id in normalized.get(field) or []:
+                    if not isinstance(item_id, str):
+                        continue
+                    if direction == "in":
+                        self._relate(name, item_id, str(data["id"]))
+                    else:
+                        self._relate(name, str(data["id"]), item_id)
+
+    def stats(self):
+        """
+        Return the number of entity copies seen, the number of unique entities stored and the number of relationship pairs.
+        """
+        with self._lock:
+            return {
+                "seen": self.seen,
+                "unique": len(self),
+                "relations": sum(len(pairs) for pairs in self.relations.values()),
+            }
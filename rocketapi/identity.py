@@ -0,0 +1,201 @@
+import sqlite3
+import threading
+from collections import OrderedDict
+
+
+class _LRU:
+    def __init__(self, size):
+        self._size = size
+        self._data = OrderedDict()
+
+    def get(self, key):
+        value = self._data.get(key)
+        if value is not None:
+            self._data.move_to_end(key)
+        return value
+
+    def set(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if self._size is not None and len(self._data) > self._size:
+            self._data.popitem(last=False)
+
+    def pop(self, key):
+        return self._data.pop(key, None)
+
+
+def _iter_identities(body):
+    stack = [body]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, dict):
+            pk = value.get("pk")
+            if pk is None:
+                pk = value.get("id")
+            if pk is not None:
+                if isinstance(value.get("username"), str):
+                    yield "user", value["username"].lower(), str(pk)
+                shortcode = value.get("code") or value.get("shortcode")
+                if isinstance(shortcode, str):
+                    yield "media", shortcode, str(pk).split("_")[0]
+            stack.extend(value.values())
+        elif isinstance(value, list):
+            stack.extend(value)
+
+
+class IdentityIndex:
+    def __init__(self, path=None, memory_size=100000, flush_interval=1.0, flush_size=1000):
+        """
+        Maps usernames to user ids and shortcodes to media ids (and back) for Instagram and Threads.
+
+        The index is filled passively from every response of the clients it is attached to:
+            index = IdentityIndex("identities.sqlite")
+            api = InstagramAPI(token)
+            api.identity_index = index
+
+        New mappings are written to the database by a background thread, in batches, every `flush_interval` seconds
+        (or as soon as `flush_size` of them are waiting). Call `flush()` to write them immediately, and `close()`
+        when done.
+
+        Args:
+            path (str): Path of the sqlite database to persist the index to (default: memory only)
+            memory_size (int): Number of mappings per table kept in memory (None for no limit)
+            flush_interval (float): Maximum number of seconds new mappings wait before being written to the database
+            flush_size (int): Number of waiting mappings that triggers a write to the database
+        """
+        # _lock guards the in-memory tables and the pending rows, _db_lock the sqlite connection
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._memory = {
+            table: _LRU(memory_size)
+            for table in ("user", "user_reverse", "media", "media_reverse")
+        }
+        self._pending = []
+        self._flush_interval = flush_interval
+        self._flush_size = flush_size
+        self._wake = threading.Event()
+        self._closed = False
+        self._flusher = None
+        self._db = None
+        if path is not None:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS user (platform TEXT, name TEXT, id TEXT, PRIMARY KEY (platform, name));
+                CREATE INDEX IF NOT EXISTS user_id ON user (platform, id);
+                CREATE TABLE IF NOT EXISTS media (platform TEXT, name TEXT, id TEXT, PRIMARY KEY (platform, name));
+                CREATE INDEX IF NOT EXISTS media_id ON media (platform, id);
+                """
+            )
+            self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+            self._flusher.start()
+
+    def observe(self, platform, body):
+        """
+        Record the usernames and shortcodes found in a response body.
+
+        Args:
+            platform (str): instagram or threads
+            body (dict): Response body
+        """
+        identities = list(_iter_identities(body))
+        if not identities:
+            return
+        with self._lock:
+            for table, name, value in identities:
+                forward = self._memory[table]
+                reverse = self._memory[table + "_reverse"]
+                old_value = forward.get((platform, name))
+                if old_value == value:
+                    continue
+                # A user id keeps only its latest username (and a media id its latest shortcode), and the other way round
+                old_name = reverse.get((platform, value))
+                if old_name is not None and old_name != name and forward.get((platform, old_name)) == value:
+                    forward.pop((platform, old_name))
+                if old_value is not None and reverse.get((platform, old_value)) == name:
+                    reverse.pop((platform, old_value))
+                forward.set((platform, name), value)
+                reverse.set((platform, value), name)
+                if self._db is not None:
+                    self._pending.append((table, platform, name, value))
+            if len(self._pending) >= self._flush_size:
+                self._wake.set()
+
+    def _flush_loop(self):
+        while not self._closed:
+            self._wake.wait(self._flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        """Write the mappings waiting for the background thread to the database."""
+        # Batches are taken and written under _db_lock, so they reach the database in order
+        with self._db_lock:
+            with self._lock:
+                pending, self._pending = self._pending, []
+            if not pending or self._db is None:
+                return
+            # Keep the latest name of every id, in the order they were seen
+            latest = {}
+            for table, platform, name, value in pending:
+                latest.pop((table, platform, value), None)
+                latest[(table, platform, value)] = name
+            with self._db:
+                for table in ("user", "media"):
+                    rows = [(platform, name, value) for (t, platform, value), name in latest.items() if t == table]
+                    if not rows:
+                        continue
+                    self._db.executemany(
+                        f"DELETE FROM {table} WHERE platform = ? AND name != ? AND id = ?",
+                        rows,
+                    )
+                    self._db.executemany(f"INSERT OR REPLACE INTO {table} VALUES (?, ?, ?)", rows)
+
+    def _get(self, table, platform, key, column, result):
+        with self._lock:
+            value = self._memory[table].get((platform, key))
+            if value is not None or self._db is None:
+                return value
+        self.flush()
+        base_table = table.split("_")[0]
+        with self._db_lock:
+            if self._db is None:
+                return None
+            row = self._db.execute(
+                f"SELECT {result} FROM {base_table} WHERE platform = ? AND {column} = ?",
+                (platform, key),
+            ).fetchone()
+        if row is None:
+            return None
+        with self._lock:
+            self._memory[table].set((platform, key), row[0])
+        return row[0]
+
+    def get_user_id(self, username, platform="instagram"):
+        """Return the user id (str) for a username, or None if unknown."""
+        return self._get("user", platform, username.lower(), "name", "id")
+
+    def get_username(self, user_id, platform="instagram"):
+        """Return the username for a user id, or None if unknown."""
+        return self._get("user_reverse", platform, str(user_id), "id", "name")
+
+    def get_media_id(self, shortcode, platform="instagram"):
+        """Return the media id (str) for a shortcode, or None if unknown."""
+        return self._get("media", platform, shortcode, "name", "id")
+
+    def get_shortcode(self, media_id, platform="instagram"):
+        """Return the shortcode for a media id, or None if unknown."""
+        return self._get("media_reverse", platform, str(media_id).split("_")[0], "id", "name")
+
+    def close(self):
+        """Write the waiting mappings, stop the background thread and close the database."""
+        if self._flusher is not None:
+            self._closed = True
+            self._wake.set()
+            self._flusher.join()
+            self._flusher = None
+        self.flush()
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
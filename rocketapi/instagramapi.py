@@ -12,27 +12,29 @@ class InstagramAPI(RocketAPI):
             max_timeout (int): Maximum timeout for requests. Please, don't use values lower than 15 seconds, it may cause problems with API.
 
         For debugging purposes you can use the following variables:
-            last_response (dict): contains the last response from the API.
-            counter (int): contains the number of requests made in the current session.
+            last_response (dict): contains the last response from the API received by the current thread.
+            counter (int): contains the number of requests made in the current session (by all threads).
+
+        The client can be shared between threads. To get the raw response of a specific call, use `capture()`.
 
         For more information, see documentation: https://docs.rocketapi.io/api/
         """
-        self.last_response = None
-        self.counter = 0
         super().__init__(token, max_timeout=max_timeout)
 
     def request(self, method, data):
         response = super().request(method, data)
-        self.last_response = response
-        self.counter += 1
         if response["status"] == "done":
             if method in ["instagram/media/get_shortcode_by_id", "instagram/media/get_id_by_shortcode"]:
+                self._observe_shortcode(
+                    data.get("id", response.get("id")), data.get("shortcode", response.get("shortcode"))
+                )
                 return response
-            
+
             if (
                 response["response"]["status_code"] == 200
                 and response["response"]["content_type"] == "application/json"
             ):
+                self._observe("instagram", method, data, response["response"]["body"])
                 return response["response"]["body"]
             elif response["response"]["status_code"] == 404:
                 raise NotFoundException("Instagram resource not found")
@@ -42,6 +44,10 @@ class InstagramAPI(RocketAPI):
                 )
         raise BadResponseException(f"Bad response from RocketAPI ({method})")
 
+    def _observe_shortcode(self, media_id, shortcode):
+        if self.identity_index is not None and media_id is not None and shortcode is not None:
+            self.identity_index.observe("instagram", {"pk": media_id, "code": shortcode})
+
     def search(self, query):
         """
         Search for a specific user, hashtag or place.
@@ -96,6 +102,19 @@ class InstagramAPI(RocketAPI):
         """
         return self.request("instagram/user/get_info_by_id", {"id": user_id})
 
+    def resolve_user_id(self, username):
+        """
+        Get user id by username, using the `identity_index` if possible (otherwise `get_user_info` is called).
+
+        Args:
+            username (str): Username
+        """
+        if self.identity_index is not None:
+            user_id = self.identity_index.get_user_id(username)
+            if user_id is not None:
+                return int(user_id)
+        return int(self.get_user_info(username)["data"]["user"]["id"])
+
     def get_user_media(self, user_id, count=12, max_id=None):
         """
         Retrieve user media by id.
@@ -125,8 +144,14 @@ class InstagramAPI(RocketAPI):
 
         You can use the `max_id` parameter to paginate through the media (take from the `next_max_id` field of the response).
 
+        If the user id is known to the `identity_index`, `get_user_media` is used instead.
+
         For more information, see documentation: https://docs.rocketapi.io/api/instagram/user/get_media_by_username
         """
+        if self.identity_index is not None:
+            user_id = self.identity_index.get_user_id(username)
+            if user_id is not None:
+                return self.get_user_media(int(user_id), count=count, max_id=max_id)
         payload = {"username": username, "count": count}
         if max_id is not None:
             payload["max_id"] = max_id
@@ -400,8 +425,14 @@ class InstagramAPI(RocketAPI):
         Args:
             media_id (int): Media id
 
+        If the media id is known to the `identity_index`, no request is made.
+
         For more information, see documentation: https://docs.rocketapi.io/api/instagram/media/get_shortcode_by_id
         """
+        if self.identity_index is not None:
+            shortcode = self.identity_index.get_shortcode(media_id)
+            if shortcode is not None:
+                return {"status": "done", "shortcode": shortcode}
         return self.request("instagram/media/get_shortcode_by_id", {"id": media_id})
 
     def get_media_id_by_shortcode(self, shortcode):
@@ -411,8 +442,14 @@ class InstagramAPI(RocketAPI):
         Args:
             shortcode (str): Media shortcode
 
+        If the shortcode is known to the `identity_index`, no request is made.
+
         For more information, see documentation: https://docs.rocketapi.io/api/instagram/media/get_id_by_shortcode
         """
+        if self.identity_index is not None:
+            media_id = self.identity_index.get_media_id(shortcode)
+            if media_id is not None:
+                return {"status": "done", "id": int(media_id)}
         return self.request(
             "instagram/media/get_id_by_shortcode", {"shortcode": shortcode}
         )
@@ -0,0 +1,249 @@
+import heapq
+import itertools
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from rocketapi.exceptions import NotFoundException
+from rocketapi.utils import entity_id, find_media, submit_in_context
+
+
+class Feed:
+    def __init__(self, kind, key, interval, seen_size):
+        """
+        State of a monitored feed.
+
+        Attributes:
+            kind (str): hashtag, location or audio
+            key: hashtag name, location id or audio id
+            interval (float): current polling interval in seconds
+            rate (float): estimated number of new posts per second
+            polls (int): number of polls made
+            errors (int): number of consecutive failed polls
+            last_error (Exception): the last polling error
+        """
+        self.kind = kind
+        self.key = key
+        self.interval = interval
+        self.rate = None
+        self.polls = 0
+        self.errors = 0
+        self.last_error = None
+        self.last_poll = None
+        self._seen = OrderedDict()
+        self._seen_size = seen_size
+
+    def _is_new(self, media_id):
+        if media_id in self._seen:
+            self._seen.move_to_end(media_id)
+            return False
+        self._seen[media_id] = True
+        if len(self._seen) > self._seen_size:
+            self._seen.popitem(last=False)
+        return True
+
+    def __repr__(self):
+        return f"<Feed {self.kind}:{self.key} interval={self.interval:.0f}s>"
+
+
+class FeedMonitor:
+    def __init__(
+        self,
+        api,
+        max_workers=8,
+        min_interval=30,
+        max_interval=3600,
+        seen_size=2000,
+        emit_initial=False,
+    ):
+        """
+        Polls many hashtag, location and audio feeds concurrently and yields only newly appeared posts.
+
+        Feeds can be added, removed and the monitor stopped from other threads while it is running.
+
+        The polling interval of every feed adapts to its observed post rate: busy feeds are polled often enough
+        to not miss posts between two polls, quiet feeds are polled less and less often.
+
+        Args:
+            api (InstagramAPI): Client to use (it can be shared with other threads)
+            max_workers (int): Maximum number of concurrent requests
+            min_interval (float): Minimum polling interval per feed, in seconds
+            max_interval (float): Maximum polling interval per feed, in seconds
+            seen_size (int): Number of media ids remembered per feed to remove duplicates
+            emit_initial (bool): Yield the posts found by the first poll of every feed (by default they are only marked as seen)
+
+        Example:
+            monitor = FeedMonitor(api)
+            monitor.add_hashtag("cats")
+            monitor.add_location(213385402)
+            for feed, media in monitor:
+                print(feed.kind, feed.key, media["code"])
+        """
+        self.api = api
+        self.max_workers = max_workers
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.seen_size = seen_size
+        self.emit_initial = emit_initial
+        self.feeds = {}
+        self._schedule = []
+        self._seq = itertools.count()
+        self._stopped = False
+        # Guards feeds, _schedule and _stopped, and wakes up iter_new
+        self._cond = threading.Condition()
+
+    def _add(self, kind, key):
+        with self._cond:
+            if (kind, key) not in self.feeds:
+                feed = Feed(kind, key, self.min_interval, self.seen_size)
+                self.feeds[(kind, key)] = feed
+                heapq.heappush(self._schedule, (time.monotonic(), next(self._seq), feed))
+                self._cond.notify_all()
+            return self.feeds[(kind, key)]
+
+    def add_hashtag(self, name):
+        """Monitor the recent tab of a hashtag (`get_hashtag_media`)."""
+        return self._add("hashtag", name)
+
+    def add_location(self, location_id):
+        """Monitor the recent tab of a location (`get_location_media`)."""
+        return self._add("location", location_id)
+
+    def add_audio(self, audio_id):
+        """Monitor the media of an audio (`get_audio_media`)."""
+        return self._add("audio", audio_id)
+
+    def remove(self, feed):
+        with self._cond:
+            self.feeds.pop((feed.kind, feed.key), None)
+
+    def stop(self):
+        """
+        Stop the monitor. The iterator returns after the requests in flight are done.
+
+        The monitor stays stopped (a new iterator returns immediately) until `start` is called.
+        """
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+    def start(self):
+        """Clear a previous `stop`, so the monitor can be iterated again."""
+        with self._cond:
+            self._stopped = False
+
+    def _fetch(self, feed):
+        if feed.kind == "hashtag":
+            return self.api.get_hashtag_media(feed.key, tab="recent")
+        if feed.kind == "location":
+            return self.api.get_location_media(feed.key, tab="recent")
+        return self.api.get_audio_media(feed.key)
+
+    def _poll(self, feed):
+        now = time.monotonic()
+        try:
+            medias = find_media(self._fetch(feed))
+            new = [media for media in reversed(medias) if feed._is_new(entity_id(media))]
+        except Exception as e:
+            return feed, now, None, e
+        return feed, now, (medias, new), None
+
+    def _next_interval(self, feed, now, page_size, new_count):
+        if feed.last_poll is None:
+            return feed.interval
+        observed = new_count / max(now - feed.last_poll, 1e-3)
+        feed.rate = observed if feed.rate is None else 0.5 * observed + 0.5 * feed.rate
+        if page_size and new_count >= page_size:
+            # The whole page is new, some posts were probably missed
+            interval = feed.interval / 2
+        elif feed.rate > 0:
+            # Aim for about half a page of new posts per poll
+            interval = max(page_size, 2) / 2 / feed.rate
+        else:
+            interval = feed.interval * 1.5
+        return min(max(interval, self.min_interval), self.max_interval)
+
+    def _update(self, feed, now, result, error):
+        if error is not None:
+            feed.errors += 1
+            feed.last_error = error
+            if isinstance(error, NotFoundException):
+                self.remove(feed)
+                return []
+            feed.interval = min(feed.interval * 2, self.max_interval)
+            return []
+
+        medias, new = result
+        first = feed.last_poll is None
+        feed.interval = self._next_interval(feed, now, len(medias), len(new))
+        feed.errors = 0
+        feed.polls += 1
+        feed.last_poll = now
+        if first and not self.emit_initial:
+            return []
+        return new
+
+    def __iter__(self):
+        return self.iter_new()
+
+    def iter_new(self):
+        """
+        Poll the feeds until `stop` is called (or there are no feeds left) and yield `(feed, media)` for every new post.
+        """
+        results = deque()
+        in_flight = 0
+
+        def done(future):
+            with self._cond:
+                results.append(future.result())
+                self._cond.notify_all()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while True:
+                due = []
+                with self._cond:
+                    while True:
+                        now = time.monotonic()
+                        while (
+                            not self._stopped
+                            and self._schedule
+                            and self._schedule[0][0] <= now
+                            and in_flight + len(due) < self.max_workers
+                        ):
+                            _, _, feed = heapq.heappop(self._schedule)
+                            # A removed feed stays in the heap, and may have been added again as a new object
+                            if self.feeds.get((feed.kind, feed.key)) is feed:
+                                due.append(feed)
+                        if due or results:
+                            break
+                        if not in_flight and (self._stopped or not self._schedule):
+                            return
+                        if not self._stopped and in_flight < self.max_workers and self._schedule:
+                            timeout = max(self._schedule[0][0] - now, 0)
+                        else:
+                            timeout = None
+                        # Woken up by finished polls, stop() and added feeds
+                        self._cond.wait(timeout)
+                    finished = list(results)
+                    results.clear()
+
+                for feed in due:
+                    submit_in_context(executor, self._poll, feed).add_done_callback(done)
+                    in_flight += 1
+
+                for feed, polled_at, result, error in finished:
+                    in_flight -= 1
+                    new = self._update(feed, polled_at, result, error)
+                    with self._cond:
+                        if self.feeds.get((feed.kind, feed.key)) is feed:
+                            heapq.heappush(self._schedule, (polled_at + feed.interval, next(self._seq), feed))
+                    for media in new:
+                        yield feed, media
+
+    def run(self, callback):
+        """
+        Poll the feeds until `stop` is called and call `callback(feed, media)` for every new post.
+        """
+        for feed, media in self.iter_new():
+            callback(feed, media)
@@ -0,0 +1,291 @@
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from rocketapi.utils import entity_id, find_key, find_media, submit_in_context
+
+
+# Maximum page sizes of the paginated endpoints
+MEDIA_PAGE_SIZE = 12
+FOLLOWERS_PAGE_SIZE = 50
+FOLLOWING_PAGE_SIZE = 200
+TAGS_PAGE_SIZE = 50
+STORIES_PER_REQUEST = 4
+
+
+def _pages(count, page_size):
+    return math.ceil(count / page_size) if count else 0
+
+
+class CrawlJob:
+    def __init__(
+        self,
+        usernames=(),
+        user_ids=(),
+        info=False,
+        media=0,
+        followers=0,
+        following=0,
+        tags=0,
+        stories=False,
+        highlights=False,
+    ):
+        """
+        High-level description of a crawl job.
+
+        Args:
+            usernames (list): Usernames to crawl
+            user_ids (list): User ids to crawl
+            info (bool): Fetch user information
+            media (int): Number of recent media to fetch per user
+            followers (int): Number of followers to fetch per user
+            following (int): Number of following to fetch per user
+            tags (int): Number of tagged media to fetch per user
+            stories (bool): Fetch user stories
+            highlights (bool): Fetch user highlights
+        """
+        self.usernames = list(usernames)
+        self.user_ids = list(user_ids)
+        self.info = info
+        self.media = media
+        self.followers = followers
+        self.following = following
+        self.tags = tags
+        self.stories = stories
+        self.highlights = highlights
+
+
+class CrawlResult:
+    def __init__(self, username=None, user_id=None):
+        """
+        Result of a crawl job for a single user.
+
+        Attributes:
+            info (dict): `get_user_info` response
+            media (list): media items
+            followers (list): follower users
+            following (list): following users
+            tags (list): tagged media
+            stories (dict): the user's reel from the `get_user_stories_bulk` response
+            highlights (dict): `get_user_highlights` response
+            errors (dict): exceptions raised by the failed parts, keyed by part name
+        """
+        self.username = username
+        self.user_id = user_id
+        self.info = None
+        self.media = []
+        self.followers = []
+        self.following = []
+        self.tags = []
+        self.stories = None
+        self.highlights = None
+        self.errors = {}
+        self._media_cursor = None
+        self._media_first_page = False
+
+    def __repr__(self):
+        return f"<CrawlResult username={self.username!r} user_id={self.user_id!r} errors={sorted(self.errors)!r}>"
+
+
+class CrawlPlan:
+    def __init__(self, job, targets):
+        """
+        Endpoints and page sizes chosen by `RequestPlanner.plan` for a crawl job.
+
+        Attributes:
+            targets (list): (username, user_id, steps) for every user, where steps are the per-user endpoints to call in order
+            executed (dict): number of requests made per endpoint by `run`
+        """
+        self.job = job
+        self.targets = targets
+        self.executed = {}
+        self._lock = threading.Lock()
+
+    def estimate(self):
+        """
+        Estimate the number of requests per endpoint, plus the `total`.
+
+        Resolving a user id from the first media page (`get_user_media_by_username`) is assumed to succeed;
+        for users without their own media on that page one extra `get_user_info` call is made.
+        """
+        estimate = {}
+        for _, _, steps in self.targets:
+            for endpoint, count in steps:
+                estimate[endpoint] = estimate.get(endpoint, 0) + count
+        if self.job.stories:
+            estimate["get_user_stories_bulk"] = _pages(len(self.targets), STORIES_PER_REQUEST)
+        estimate["total"] = sum(estimate.values())
+        return estimate
+
+    def _call(self, endpoint, fn, *args, **kwargs):
+        with self._lock:
+            self.executed[endpoint] = self.executed.get(endpoint, 0) + 1
+        return fn(*args, **kwargs)
+
+    def _paginate(self, endpoint, fn, user_id, total, page_size, items_key, cursor_key, items=None, max_id=None):
+        items = list(items or [])
+        while len(items) < total:
+            body = self._call(endpoint, fn, user_id, count=min(page_size, total - len(items)), max_id=max_id)
+            page = find_media(body, graphql=True) if items_key is None else body.get(items_key) or []
+            items.extend(page)
+            max_id = find_key(body, cursor_key)
+            if not page or not max_id or body.get("more_available") is False or find_key(body, "has_next_page") is False:
+                break
+        return items[:total]
+
+    def _run_user(self, api, result, steps):
+        for endpoint, _ in steps:
+            try:
+                self._run_step(api, result, endpoint)
+            except Exception as e:
+                result.errors[endpoint] = e
+                if result.user_id is None:
+                    return
+
+    def _run_step(self, api, result, endpoint):
+        job = self.job
+        if endpoint == "get_user_info":
+            result.info = self._call(endpoint, api.get_user_info, result.username)
+            result.user_id = int(result.info["data"]["user"]["id"])
+        elif endpoint == "get_user_info_by_id":
+            result.info = self._call(endpoint, api.get_user_info_by_id, result.user_id)
+        elif endpoint == "get_user_media_by_username":
+            body = self._call(endpoint, api.get_user_media_by_username, result.username, count=min(MEDIA_PAGE_SIZE, job.media))
+            result.media = body.get("items") or []
+            result._media_first_page = True
+            if body.get("more_available") is not False:
+                result._media_cursor = body.get("next_max_id")
+            if result.user_id is None:
+                # Pinned and collab posts may belong to another account, so only trust an item authored by the user itself
+                for item in result.media:
+                    user = item.get("user") or {}
+                    if str(user.get("username", "")).lower() == result.username.lower():
+                        result.user_id = int(entity_id(user))
+                        break
+            if result.user_id is None:
+                result.info = self._call("get_user_info", api.get_user_info, result.username)
+                result.user_id = int(result.info["data"]["user"]["id"])
+        elif endpoint == "get_user_media":
+            if result._media_first_page and not result._media_cursor:
+                return
+            result.media = self._paginate(
+                endpoint,
+                api.get_user_media,
+                result.user_id,
+                job.media,
+                MEDIA_PAGE_SIZE,
+                "items",
+                "next_max_id",
+                items=result.media,
+                max_id=result._media_cursor,
+            )
+        elif endpoint == "get_user_followers":
+            result.followers = self._paginate(endpoint, api.get_user_followers, result.user_id, job.followers, FOLLOWERS_PAGE_SIZE, "users", "next_max_id")
+        elif endpoint == "get_user_following":
+            result.following = self._paginate(endpoint, api.get_user_following, result.user_id, job.following, FOLLOWING_PAGE_SIZE, "users", "next_max_id")
+        elif endpoint == "get_user_tags":
+            result.tags = self._paginate(endpoint, api.get_user_tags, result.user_id, job.tags, TAGS_PAGE_SIZE, None, "end_cursor")
+        elif endpoint == "get_user_highlights":
+            result.highlights = self._call(endpoint, api.get_user_highlights, result.user_id)
+
+    def _run_stories(self, api, results):
+        with_ids = [result for result in results if result.user_id is not None]
+        for i in range(0, len(with_ids), STORIES_PER_REQUEST):
+            chunk = with_ids[i : i + STORIES_PER_REQUEST]
+            try:
+                body = self._call("get_user_stories_bulk", api.get_user_stories_bulk, [result.user_id for result in chunk])
+            except Exception as e:
+                for result in chunk:
+                    result.errors["get_user_stories_bulk"] = e
+                continue
+            reels = body.get("reels") or {}
+            for result in chunk:
+                result.stories = reels.get(str(result.user_id))
+
+    def run(self, api, max_workers=8):
+        """
+        Execute the plan and return the list of `CrawlResult`, in the order of the job's users.
+
+        Args:
+            api (InstagramAPI): Client to use (it can be shared with other threads)
+            max_workers (int): Maximum number of concurrent requests
+        """
+        results = [CrawlResult(username, user_id) for username, user_id, _ in self.targets]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                submit_in_context(executor, self._run_user, api, result, steps)
+                for result, (_, _, steps) in zip(results, self.targets)
+            ]
+            for future in futures:
+                future.result()
+        if self.job.stories:
+            self._run_stories(api, results)
+        return results
+
+
+class RequestPlanner:
+    def __init__(self, identity_index=None):
+        """
+        Chooses the endpoints and page sizes that need the fewest requests for a crawl job.
+
+        - `get_user_media_by_username` is used to get media without resolving the user id first,
+          and its first page also resolves the user id when other endpoints need it
+        - paginated endpoints are called with their maximum page size
+        - stories are requested for 4 users at once
+        - user ids known to the `identity_index` are not resolved again
+
+        Args:
+            identity_index (IdentityIndex): Index to look up known user ids
+
+        Example:
+            job = CrawlJob(usernames=usernames, media=24, followers=200)
+            plan = RequestPlanner(api.identity_index).plan(job)
+            print(plan.estimate())
+            results = plan.run(api)
+        """
+        self.identity_index = identity_index
+
+    def _steps(self, job, username, user_id):
+        needs_id = job.followers or job.following or job.tags or job.stories or job.highlights
+        resolved = user_id is not None
+        steps = []
+        if job.info:
+            steps.append(("get_user_info" if username is not None else "get_user_info_by_id", 1))
+            resolved = True
+        if job.media:
+            if not resolved:
+                steps.append(("get_user_media_by_username", 1))
+                if job.media > MEDIA_PAGE_SIZE:
+                    steps.append(("get_user_media", _pages(job.media, MEDIA_PAGE_SIZE) - 1))
+                resolved = True
+            else:
+                steps.append(("get_user_media", _pages(job.media, MEDIA_PAGE_SIZE)))
+        if needs_id and not resolved:
+            steps.append(("get_user_info", 1))
+        if job.followers:
+            steps.append(("get_user_followers", _pages(job.followers, FOLLOWERS_PAGE_SIZE)))
+        if job.following:
+            steps.append(("get_user_following", _pages(job.following, FOLLOWING_PAGE_SIZE)))
+        if job.tags:
+            steps.append(("get_user_tags", _pages(job.tags, TAGS_PAGE_SIZE)))
+        if job.highlights:
+            steps.append(("get_user_highlights", 1))
+        return steps
+
+    def plan(self, job):
+        """
+        Build the plan of a crawl job.
+
+        Args:
+            job (CrawlJob): Job to plan
+        """
+        targets = []
+        for username in job.usernames:
+            user_id = None
+            if self.identity_index is not None:
+                user_id = self.identity_index.get_user_id(username)
+            user_id = int(user_id) if user_id is not None else None
+            targets.append((username, user_id, self._steps(job, username, user_id)))
+        for user_id in job.user_ids:
+            targets.append((None, user_id, self._steps(job, None, user_id)))
+        return CrawlPlan(job, targets)
@@ -1,4 +1,8 @@
-import requests
+import threading
+
+from rocketapi.stats import CallContext, RequestStats
+from rocketapi.tracing import RequestTimings, emit_span
+from rocketapi.transport import default_transport
 
 
 class RocketAPI:
@@ -8,20 +12,106 @@ class RocketAPI:
 
         If your base_url is different from the default, you can reassign it after initialization.
 
+        The client is safe to share between threads: kept-alive HTTP connections are pooled and reused by all threads,
+        `counter` is summed over all threads and `last_response` is the last response received by the calling thread.
+        Use `capture()` to get the raw responses of specific calls.
+
+        HTTP requests are sent by `transport`: `RequestsTransport` if `requests` is installed, `HTTPTransport` (standard library only) otherwise.
+        You can reassign it after initialization.
+
+        Set `identity_index` to an `IdentityIndex` to collect usernames/user ids and shortcodes/media ids from every response,
+        and `entity_store` to an `EntityStore` to collect deduplicated users, media and comments.
+
+        Set `scheduler` to a `RequestScheduler` to limit concurrency and rate, and to prioritise requests between jobs.
+
+        The phases of every request are timed: see `last_timings` and `capture()`.
+        Set `tracer` to an OpenTelemetry tracer to emit a span per request, named after the endpoint path.
+
         For more information, see documentation: https://docs.rocketapi.io/api/
         """
         self.base_url = "https://v1.rocketapi.io/"
         self.version = "1.0.12"
         self.token = token
         self.max_timeout = max_timeout
+        self.stats = RequestStats()
+        self.identity_index = None
+        self.entity_store = None
+        self.scheduler = None
+        self.tracer = None
+        self.transport = None
+        self._transport_lock = threading.Lock()
+
+    @property
+    def counter(self):
+        return self.stats.counter
+
+    @counter.setter
+    def counter(self, value):
+        self.stats.reset(value)
+
+    @property
+    def last_response(self):
+        return self.stats.last_response
+
+    @last_response.setter
+    def last_response(self, response):
+        self.stats.last_response = response
+
+    @property
+    def last_timings(self):
+        """`RequestTimings` of the last request made by the current thread."""
+        return self.stats.last_timings
+
+    def capture(self):
+        """
+        Capture the raw responses of the requests made by the current thread inside a `with` block.
+
+        Example:
+            with api.capture() as call:
+                user = api.get_user_info("kanyewest")
+            print(call.response)
+        """
+        return CallContext()
+
+    def _observe(self, platform, method, data, body):
+        if self.identity_index is not None:
+            self.identity_index.observe(platform, body)
+        if self.entity_store is not None:
+            self.entity_store.observe(platform, method, data, body)
+
+    def _transport(self):
+        if self.transport is None:
+            with self._transport_lock:
+                if self.transport is None:
+                    self.transport = default_transport()
+        return self.transport
 
     def request(self, method, data):
-        return requests.post(
-            url=self.base_url + method,
-            json=data,
-            headers={
+        timings = RequestTimings(method)
+        try:
+            if self.scheduler is None:
+                response = self._request(method, data, timings)
+            else:
+                with self.scheduler.slot():
+                    timings.mark("schedule")
+                    response = self._request(method, data, timings)
+        except Exception as e:
+            if self.tracer is not None:
+                emit_span(self.tracer, timings, error=e)
+            raise
+        self.stats.record(response, timings)
+        if self.tracer is not None:
+            emit_span(self.tracer, timings)
+        return response
+
+    def _request(self, method, data, timings):
+        return self._transport().post(
+            self.base_url + method,
+            data,
+            {
                 "Authorization": f"Token {self.token}",
                 "User-Agent": f"RocketAPI Python SDK/{self.version}",
             },
-            timeout=self.max_timeout,
-        ).json()
+            self.max_timeout,
+            timings,
+        )
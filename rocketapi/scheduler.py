@@ -0,0 +1,166 @@
+import contextvars
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+
+
+INTERACTIVE = 0
+NORMAL = 1
+BACKGROUND = 2
+
+_current_job = contextvars.ContextVar("rocketapi_scheduler_job", default=("default", NORMAL))
+
+
+class QueueMetrics:
+    def __init__(self):
+        """
+        Wait-time metrics of a (job, priority) queue.
+
+        Attributes:
+            requests (int): number of requests granted
+            waiting (int): number of requests currently waiting
+            total_wait (float): total wait time in seconds
+            max_wait (float): maximum wait time in seconds
+        """
+        self.requests = 0
+        self.waiting = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    @property
+    def mean_wait(self):
+        return self.total_wait / self.requests if self.requests else 0.0
+
+    def as_dict(self):
+        return {
+            "requests": self.requests,
+            "waiting": self.waiting,
+            "total_wait": self.total_wait,
+            "max_wait": self.max_wait,
+            "mean_wait": self.mean_wait,
+        }
+
+
+class RequestScheduler:
+    def __init__(self, max_concurrency=8, rate_limit=None, burst=None):
+        """
+        Schedules the requests of the clients it is attached to.
+
+        Requests wait for one of `max_concurrency` slots. Waiting requests with a higher priority class
+        (INTERACTIVE, then NORMAL, then BACKGROUND) are always granted first; inside a priority class,
+        slots are shared between named jobs by weighted fair queuing.
+
+        The job and priority of the requests are set per thread (or asyncio task) with `job()`:
+            scheduler = RequestScheduler(max_concurrency=16, rate_limit=20)
+            api.scheduler = scheduler
+            with scheduler.job("followers-crawl", priority=BACKGROUND):
+                api.get_user_followers(user_id)
+
+        Args:
+            max_concurrency (int): Maximum number of concurrent requests
+            rate_limit (float): Maximum number of requests started per second (default: no limit)
+            burst (int): Maximum number of requests started at once under the rate limit (default: max_concurrency)
+        """
+        self.max_concurrency = max_concurrency
+        self.rate_limit = rate_limit
+        self.burst = burst if burst is not None else max_concurrency
+        self._cond = threading.Condition()
+        self._heap = []
+        self._seq = itertools.count()
+        self._active = 0
+        self._weights = {}
+        self._finish = {}
+        self._virtual_time = 0.0
+        self._tokens = float(self.burst)
+        self._refilled_at = time.monotonic()
+        self._metrics = {}
+
+    def set_weight(self, job, weight):
+        """Set the share of a job inside its priority class (default: 1)."""
+        if weight <= 0:
+            raise ValueError("weight must be positive")
+        with self._cond:
+            self._weights[job] = weight
+
+    @contextmanager
+    def job(self, name, priority=NORMAL, weight=None):
+        """
+        Run the requests made inside the `with` block as part of a named job.
+
+        Args:
+            name (str): Job name
+            priority (int): INTERACTIVE, NORMAL or BACKGROUND
+            weight (float): Share of the job inside its priority class
+        """
+        if weight is not None:
+            self.set_weight(name, weight)
+        token = _current_job.set((name, priority))
+        try:
+            yield
+        finally:
+            _current_job.reset(token)
+
+    def _refill(self, now):
+        if self.rate_limit is None:
+            return
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate_limit)
+        self._refilled_at = now
+
+    def acquire(self):
+        job, priority = _current_job.get()
+        enqueued_at = time.monotonic()
+        with self._cond:
+            metrics = self._metrics.setdefault((job, priority), QueueMetrics())
+            tag = max(self._virtual_time, self._finish.get(job, 0.0)) + 1.0 / self._weights.get(job, 1)
+            self._finish[job] = tag
+            entry = (priority, tag, next(self._seq))
+            heapq.heappush(self._heap, entry)
+            metrics.waiting += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    timeout = None
+                    if self._heap[0] is entry and self._active < self.max_concurrency:
+                        if self.rate_limit is None or self._tokens >= 1:
+                            break
+                        timeout = (1 - self._tokens) / self.rate_limit
+                    self._cond.wait(timeout)
+            except BaseException:
+                self._heap.remove(entry)
+                heapq.heapify(self._heap)
+                metrics.waiting -= 1
+                self._cond.notify_all()
+                raise
+            heapq.heappop(self._heap)
+            self._active += 1
+            if self.rate_limit is not None:
+                self._tokens -= 1
+            self._virtual_time = tag
+            waited = now - enqueued_at
+            metrics.waiting -= 1
+            metrics.requests += 1
+            metrics.total_wait += waited
+            metrics.max_wait = max(metrics.max_wait, waited)
+            self._cond.notify_all()
+
+    def release(self):
+        with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self):
+        """Hold a request slot for the duration of the `with` block."""
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def metrics(self):
+        """Return the wait-time metrics of every queue, keyed by (job, priority)."""
+        with self._cond:
+            return {key: metrics.as_dict() for key, metrics in self._metrics.items()}
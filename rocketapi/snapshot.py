@@ -0,0 +1,196 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from rocketapi.utils import submit_in_context
+
+
+HIGHLIGHTS_PER_REQUEST = 4
+
+
+class ProfileSnapshot:
+    def __init__(self, username=None, user_id=None):
+        """
+        Result of `ProfileSnapshotter.snapshot`.
+
+        Every part holds the response body of the corresponding `InstagramAPI` method, or None if the call failed or was skipped:
+            info, about, highlights, highlight_stories, stories, live, similar_accounts, media
+
+        `highlight_stories` merges the responses of all `get_highlight_stories_bulk` calls (`reels` and `reels_media` fields).
+
+        Args:
+            username (str): Username
+            user_id (int): User id
+
+        Attributes:
+            errors (dict): exceptions raised by the failed parts, keyed by part name
+        """
+        self.username = username
+        self.user_id = user_id
+        self.info = None
+        self.about = None
+        self.highlights = None
+        self.highlight_stories = None
+        self.stories = None
+        self.live = None
+        self.similar_accounts = None
+        self.media = None
+        self.errors = {}
+
+    @property
+    def ok(self):
+        return not self.errors
+
+    def __repr__(self):
+        return f"<ProfileSnapshot username={self.username!r} user_id={self.user_id!r} errors={sorted(self.errors)!r}>"
+
+
+class _Job:
+    def __init__(self, executor, on_done=None):
+        self._executor = executor
+        self._on_done = on_done
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.done = threading.Event()
+
+    def submit(self, fn, *args):
+        with self._lock:
+            self._pending += 1
+        submit_in_context(self._executor, self._run, fn, args)
+
+    def _run(self, fn, args):
+        try:
+            fn(*args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+                finished = self._pending == 0
+            if finished:
+                self.done.set()
+                if self._on_done is not None:
+                    self._on_done()
+
+
+class ProfileSnapshotter:
+    def __init__(self, api, max_workers=8, media_count=12):
+        """
+        Builds full snapshots of Instagram accounts.
+
+        The calls are run as a dependency graph: `get_user_info` resolves the user id, then `get_user_about`,
+        `get_user_highlights`, `get_user_stories`, `get_user_live`, `get_user_similar_accounts` and `get_user_media`
+        run concurrently, and highlight stories are requested in chunks of 4 as soon as the highlights arrive.
+        If the user id is already known, `get_user_info_by_id` runs concurrently with the other calls.
+
+        Args:
+            api (InstagramAPI): Client to use (it can be shared with other threads)
+            max_workers (int): Maximum number of concurrent requests, shared by all snapshots
+            media_count (int): Number of media to retrieve for the first page of `get_user_media`
+        """
+        self.api = api
+        self.max_workers = max_workers
+        self.media_count = media_count
+
+    def snapshot(self, username=None, user_id=None):
+        """
+        Build a snapshot of a single account.
+
+        Args:
+            username (str): Username
+            user_id (int): User id (if known, `get_user_info_by_id` is used instead of `get_user_info`)
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            snapshot = ProfileSnapshot(username=username, user_id=user_id)
+            self._start(executor, snapshot).done.wait()
+        return snapshot
+
+    def snapshot_many(self, usernames):
+        """
+        Build snapshots of many accounts, with at most `max_workers` requests in flight overall.
+
+        Snapshots are yielded in completion order.
+
+        Args:
+            usernames (list): Usernames, or (username, user_id) pairs for accounts whose user id is already known
+        """
+        accounts = [(account, None) if isinstance(account, str) else tuple(account) for account in usernames]
+        finished = queue.Queue()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            started = 0
+            for _ in range(min(self.max_workers, len(accounts))):
+                self._start_many(executor, accounts[started], finished)
+                started += 1
+            for _ in range(len(accounts)):
+                snapshot = finished.get()
+                if started < len(accounts):
+                    self._start_many(executor, accounts[started], finished)
+                    started += 1
+                yield snapshot
+
+    def _start_many(self, executor, account, finished):
+        username, user_id = account
+        snapshot = ProfileSnapshot(username=username, user_id=user_id)
+        self._start(executor, snapshot, lambda: finished.put(snapshot))
+
+    def _start(self, executor, snapshot, on_done=None):
+        job = _Job(executor, on_done)
+        job.submit(self._info, job, snapshot)
+        return job
+
+    def _call(self, snapshot, part, fn, *args):
+        try:
+            return fn(*args)
+        except Exception as e:
+            snapshot.errors[part] = e
+            return None
+
+    def _info(self, job, snapshot):
+        if snapshot.user_id is not None:
+            # Nothing depends on the info, so it runs next to the other parts
+            job.submit(self._part, snapshot, "info", self.api.get_user_info_by_id, snapshot.user_id)
+        else:
+            snapshot.info = self._call(snapshot, "info", self.api.get_user_info, snapshot.username)
+            try:
+                snapshot.user_id = int(snapshot.info["data"]["user"]["id"])
+            except (KeyError, TypeError, ValueError):
+                snapshot.errors.setdefault("info", ValueError("User id not found in get_user_info response"))
+                return
+
+        job.submit(self._part, snapshot, "about", self.api.get_user_about, snapshot.user_id)
+        job.submit(self._highlights, job, snapshot)
+        job.submit(self._part, snapshot, "stories", self.api.get_user_stories, snapshot.user_id)
+        job.submit(self._part, snapshot, "live", self.api.get_user_live, snapshot.user_id)
+        job.submit(self._part, snapshot, "similar_accounts", self.api.get_user_similar_accounts, snapshot.user_id)
+        job.submit(self._part, snapshot, "media", self.api.get_user_media, snapshot.user_id, self.media_count)
+
+    def _part(self, snapshot, part, fn, *args):
+        setattr(snapshot, part, self._call(snapshot, part, fn, *args))
+
+    def _highlights(self, job, snapshot):
+        snapshot.highlights = self._call(snapshot, "highlights", self.api.get_user_highlights, snapshot.user_id)
+        if snapshot.highlights is None:
+            return
+
+        highlight_ids = []
+        for item in snapshot.highlights.get("tray", []):
+            highlight_id = str(item.get("id", ""))
+            if highlight_id.startswith("highlight:"):
+                highlight_id = highlight_id[len("highlight:"):]
+            if highlight_id:
+                highlight_ids.append(highlight_id)
+        if not highlight_ids:
+            return
+
+        snapshot.highlight_stories = {"reels": {}, "reels_media": []}
+        lock = threading.Lock()
+        for i in range(0, len(highlight_ids), HIGHLIGHTS_PER_REQUEST):
+            chunk = highlight_ids[i : i + HIGHLIGHTS_PER_REQUEST]
+            job.submit(self._highlight_stories, snapshot, lock, i // HIGHLIGHTS_PER_REQUEST, chunk)
+
+    def _highlight_stories(self, snapshot, lock, index, highlight_ids):
+        part = f"highlight_stories[{index}]"
+        response = self._call(snapshot, part, self.api.get_highlight_stories_bulk, highlight_ids)
+        if response is None:
+            return
+        with lock:
+            snapshot.highlight_stories["reels"].update(response.get("reels") or {})
+            snapshot.highlight_stories["reels_media"].extend(response.get("reels_media") or [])
@@ -0,0 +1,110 @@
+import contextvars
+import threading
+import weakref
+
+
+_active_captures = contextvars.ContextVar("rocketapi_active_captures", default=())
+
+
+class _Cell:
+    __slots__ = ("count", "__weakref__")
+
+    def __init__(self):
+        self.count = 0
+
+
+class RequestStats:
+    def __init__(self):
+        """
+        Request statistics that can be shared between threads.
+
+        Every thread counts its own requests, so recording a request never takes a lock.
+        The per-thread counters are summed when `counter` is read, and folded into a single total when their thread exits.
+        """
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._cells = set()
+        self._base = 0
+
+    def _cell(self):
+        local = self._local
+        cell = getattr(local, "cell", None)
+        if cell is None:
+            cell = _Cell()
+            with self._lock:
+                self._cells.add(cell)
+            local.cell = cell
+            # The thread-local holder is dropped when the thread exits
+            holder = local.holder = _Cell()
+            weakref.finalize(holder, self._retire, cell)
+        return cell
+
+    def _retire(self, cell):
+        with self._lock:
+            # Cells dropped by `reset` are not counted anymore
+            if cell in self._cells:
+                self._cells.remove(cell)
+                self._base += cell.count
+
+    def record(self, response, timings=None):
+        self._cell().count += 1
+        self._local.last_response = response
+        self._local.last_timings = timings
+        for capture in _active_captures.get():
+            capture.responses.append(response)
+            capture.timings.append(timings)
+
+    @property
+    def counter(self):
+        with self._lock:
+            return self._base + sum(cell.count for cell in self._cells)
+
+    @property
+    def last_response(self):
+        return getattr(self._local, "last_response", None)
+
+    @last_response.setter
+    def last_response(self, response):
+        self._local.last_response = response
+
+    @property
+    def last_timings(self):
+        return getattr(self._local, "last_timings", None)
+
+    def reset(self, counter=0):
+        with self._lock:
+            self._local = threading.local()
+            self._cells = set()
+            self._base = counter
+
+
+class CallContext:
+    def __init__(self):
+        """
+        Collects the raw responses of the requests made by the current thread (or asyncio task) inside a `with client.capture()` block.
+
+        Attributes:
+            responses (list): raw RocketAPI responses, in the order they were received.
+            timings (list): `RequestTimings` of the responses.
+        """
+        self.responses = []
+        self.timings = []
+        self._token = None
+
+    @property
+    def response(self):
+        """The raw response of the last request made inside the block."""
+        return self.responses[-1] if self.responses else None
+
+    @property
+    def counter(self):
+        return len(self.responses)
+
+    def __enter__(self):
+        self._token = _active_captures.set(_active_captures.get() + (self,))
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _active_captures.reset(self._token)
+        self._token = None
+        return False
@@ -12,24 +12,23 @@ class ThreadsAPI(RocketAPI):
             max_timeout (int): Maximum timeout for requests. Please, don't use values lower than 15 seconds, it may cause problems with API.
 
         For debugging purposes you can use the following variables:
-            last_response (dict): contains the last response from the API.
-            counter (int): contains the number of requests made in the current session.
+            last_response (dict): contains the last response from the API received by the current thread.
+            counter (int): contains the number of requests made in the current session (by all threads).
+
+        The client can be shared between threads. To get the raw response of a specific call, use `capture()`.
 
         For more information, see documentation: https://docs.rocketapi.io/api/
         """
-        self.last_response = None
-        self.counter = 0
         super().__init__(token, max_timeout=max_timeout)
 
     def request(self, method, data):
         response = super().request(method, data)
-        self.last_response = response
-        self.counter += 1
         if response["status"] == "done":
             if (
                 response["response"]["status_code"] == 200
                 and response["response"]["content_type"] == "application/json"
             ):
+                self._observe("threads", method, data, response["response"]["body"])
                 return response["response"]["body"]
             elif response["response"]["status_code"] == 404:
                 raise NotFoundException("Instagram resource not found")
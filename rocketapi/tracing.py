@@ -0,0 +1,67 @@
+import time
+
+
+class RequestTimings:
+    def __init__(self, method):
+        """
+        Time spent in every phase of a request, in seconds.
+
+        Phases, in order (a phase is missing if it did not happen):
+            schedule: waiting for a slot of the client's `scheduler`
+            connect: opening the connection, including DNS and TLS (only measured by transports that expose it)
+            wait: sending the request and waiting for the response headers (RocketAPI queueing and Instagram/Threads time,
+                plus connection setup if the transport does not measure it separately)
+            download: reading the response body
+            decode: decoding the JSON response
+
+        Attributes:
+            method (str): API method (endpoint path)
+            phases (dict): phase name -> duration
+            started_at (int): start time, in nanoseconds since the epoch
+        """
+        self.method = method
+        self.phases = {}
+        self.started_at = time.time_ns()
+        self._mark = time.perf_counter()
+
+    def mark(self, phase):
+        """End the current phase and start the next one."""
+        now = time.perf_counter()
+        self.phases[phase] = self.phases.get(phase, 0.0) + now - self._mark
+        self._mark = now
+
+    @property
+    def total(self):
+        return sum(self.phases.values())
+
+    def __repr__(self):
+        phases = " ".join(f"{phase}={duration * 1000:.1f}ms" for phase, duration in self.phases.items())
+        return f"<RequestTimings {self.method} {phases}>"
+
+
+def emit_span(tracer, timings, error=None):
+    """
+    Emit a span named after the endpoint path, with a child span per phase, to an OpenTelemetry compatible tracer.
+    """
+    span = tracer.start_span(
+        timings.method,
+        start_time=timings.started_at,
+        attributes={f"rocketapi.{phase}_ms": duration * 1000 for phase, duration in timings.phases.items()},
+    )
+    try:
+        from opentelemetry import trace
+
+        context = trace.set_span_in_context(span)
+    except ImportError:
+        context = None
+
+    offset = timings.started_at
+    try:
+        for phase, duration in timings.phases.items():
+            end = offset + int(duration * 1e9)
+            tracer.start_span(phase, context=context, start_time=offset).end(end_time=end)
+            offset = end
+        if error is not None:
+            span.record_exception(error)
+    finally:
+        span.end(end_time=offset)
@@ -0,0 +1,164 @@
+import importlib.util
+import json
+import threading
+
+
+class RequestsTransport:
+    def __init__(self, pool_size=32):
+        """
+        Transport based on `requests`. All threads share one session, so kept-alive connections are reused
+        by every thread (and every thread pool) using the client.
+
+        Args:
+            pool_size (int): Maximum number of connections kept alive per host
+        """
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+
+    def post(self, url, data, headers, timeout, timings):
+        http_response = self._session.post(url=url, json=data, headers=headers, timeout=timeout, stream=True)
+        timings.mark("wait")
+        http_response.content  # read the whole body, which releases the connection to the pool
+        timings.mark("download")
+        response = http_response.json()
+        timings.mark("decode")
+        return response
+
+
+class HTTPTransport:
+    def __init__(self, pool_size=32):
+        """
+        Lightweight transport built on the standard library (`http.client`).
+
+        Kept-alive connections are pooled per host and shared by all threads. A request sent on a pooled connection
+        that was closed by the server in the meantime is retried once on a new connection.
+
+        HTTP proxies are read from the `HTTP_PROXY` / `HTTPS_PROXY` / `NO_PROXY` environment variables
+        (as `requests` does) when the transport is created.
+
+        Args:
+            pool_size (int): Maximum number of idle connections kept alive per host
+        """
+        from urllib.request import getproxies
+
+        self.pool_size = pool_size
+        self._proxies = getproxies()
+        self._lock = threading.Lock()
+        self._idle = {}
+        self._routes = {}
+
+    def _route(self, scheme, host):
+        """Return (proxy host, proxy headers) for a host, or None to connect directly."""
+        with self._lock:
+            if (scheme, host) in self._routes:
+                return self._routes[(scheme, host)]
+        import base64
+        from urllib.parse import unquote, urlsplit
+        from urllib.request import proxy_bypass
+
+        route = None
+        proxy = self._proxies.get(scheme)
+        if proxy and not proxy_bypass(host):
+            parts = urlsplit(proxy if "://" in proxy else "http://" + proxy)
+            headers = {}
+            if parts.username:
+                credentials = f"{unquote(parts.username)}:{unquote(parts.password or '')}"
+                headers["Proxy-Authorization"] = "Basic " + base64.b64encode(credentials.encode("utf-8")).decode("ascii")
+            route = (f"{parts.hostname}:{parts.port or 80}", headers)
+        with self._lock:
+            self._routes[(scheme, host)] = route
+        return route
+
+    def _connect(self, scheme, host, route, timeout):
+        import http.client
+
+        if route is not None:
+            proxy_host, proxy_headers = route
+            if scheme == "https":
+                # Tunnel through the proxy with CONNECT
+                connection = http.client.HTTPSConnection(proxy_host, timeout=timeout)
+                connection.set_tunnel(host, headers=proxy_headers)
+                return connection
+            return http.client.HTTPConnection(proxy_host, timeout=timeout)
+        if scheme == "https":
+            return http.client.HTTPSConnection(host, timeout=timeout)
+        return http.client.HTTPConnection(host, timeout=timeout)
+
+    def _acquire(self, scheme, host, route, timeout):
+        with self._lock:
+            idle = self._idle.get((scheme, host))
+            connection = idle.pop() if idle else None
+        if connection is None:
+            return self._connect(scheme, host, route, timeout)
+        connection.timeout = timeout
+        if connection.sock is not None:
+            connection.sock.settimeout(timeout)
+        return connection
+
+    def _release(self, scheme, host, connection):
+        with self._lock:
+            idle = self._idle.setdefault((scheme, host), [])
+            if len(idle) < self.pool_size:
+                idle.append(connection)
+                return
+        connection.close()
+
+    def post(self, url, data, headers, timeout, timings):
+        import http.client
+        from urllib.parse import urlsplit
+
+        parts = urlsplit(url)
+        route = self._route(parts.scheme, parts.netloc)
+        if route is not None and parts.scheme == "http":
+            # Plain HTTP requests are forwarded by the proxy itself
+            path = url
+            headers = dict(headers, **route[1])
+        else:
+            path = parts.path + ("?" + parts.query if parts.query else "")
+        body = json.dumps(data).encode("utf-8")
+        headers = dict(headers, **{"Content-Type": "application/json", "Accept": "application/json"})
+
+        while True:
+            connection = self._acquire(parts.scheme, parts.netloc, route, timeout)
+            reused = connection.sock is not None
+            try:
+                if not reused:
+                    connection.connect()
+                    timings.mark("connect")
+                connection.request("POST", path, body=body, headers=headers)
+                http_response = connection.getresponse()
+                break
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                connection.close()
+                if not reused:
+                    raise
+            except Exception:
+                connection.close()
+                raise
+        timings.mark("wait")
+
+        try:
+            content = http_response.read()
+        except Exception:
+            connection.close()
+            raise
+        if http_response.will_close:
+            connection.close()
+        else:
+            self._release(parts.scheme, parts.netloc, connection)
+        timings.mark("download")
+        response = json.loads(content)
+        timings.mark("decode")
+        return response
+
+
+def default_transport():
+    """Return a `RequestsTransport` if `requests` is installed, an `HTTPTransport` otherwise."""
+    if importlib.util.find_spec("requests") is not None:
+        return RequestsTransport()
+    return HTTPTransport()
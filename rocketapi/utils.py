@@ -0,0 +1,79 @@
+import contextvars
+
+
+def submit_in_context(executor, fn, *args):
+    """
+    Submit a call to an executor, running it in a copy of the current context.
+
+    Worker threads do not inherit context variables, so without this the scheduler job (`RequestScheduler.job`)
+    and `capture()` blocks of the caller would not apply to the requests made by the workers.
+    """
+    return executor.submit(contextvars.copy_context().run, fn, *args)
+
+
+def _is_graphql_media(value):
+    return "shortcode" in value and "taken_at_timestamp" in value and "id" in value
+
+
+def find_media(body, graphql=False):
+    """
+    Find media objects in a response body, wherever they are nested (sections, items, edges...).
+
+    A media object is a dict with the `code` (shortcode) and `taken_at` fields. Carousel children are not returned separately.
+
+    Args:
+        body (dict): Response body
+        graphql (bool): Also find GraphQL media nodes (with the `shortcode` and `taken_at_timestamp` fields)
+    """
+    stack = [body]
+    found = []
+    while stack:
+        value = stack.pop()
+        if isinstance(value, dict):
+            if (
+                "code" in value and "taken_at" in value and ("pk" in value or "id" in value)
+            ) or (graphql and _is_graphql_media(value)):
+                found.append(value)
+                continue
+            stack.extend(reversed(list(value.values())))
+        elif isinstance(value, list):
+            stack.extend(reversed(value))
+    return found
+
+
+def find_key(body, key):
+    """
+    Return the first non-null value of a key in a response body, wherever it is nested (e.g. GraphQL `end_cursor`).
+    """
+    stack = [body]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, dict):
+            if value.get(key) is not None:
+                return value[key]
+            stack.extend(value.values())
+        elif isinstance(value, list):
+            stack.extend(value)
+    return None
+
+
+def thread_replies(body):
+    """
+    Return the reply threads of a Threads `get_thread_replies` response body, and the cursor of the next page
+    (the `max_id` argument, None on the last page).
+    """
+    data = body.get("data") or body
+    if isinstance(data.get("data"), dict):
+        data = data["data"]
+    paging_tokens = data.get("paging_tokens") or body.get("paging_tokens") or {}
+    return data.get("reply_threads") or [], paging_tokens.get("downwards")
+
+
+def entity_id(value):
+    """
+    Return the id (str) of a user, media or comment object. Media ids like `<pk>_<user id>` are reduced to the pk.
+    """
+    pk = value.get("pk")
+    if pk is None:
+        pk = value.get("id")
+    return str(pk).split("_")[0]
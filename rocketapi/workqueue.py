@@ -0,0 +1,354 @@
+import contextvars
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+from rocketapi.exceptions import NotFoundException
+from rocketapi.utils import find_key, thread_replies
+
+
+def next_cursor(endpoint, body):
+    """
+    Return the pagination arguments of the next page of an endpoint response, or None if it is the last page.
+
+    Args:
+        endpoint (str): Client method name (e.g. "get_user_followers")
+        body (dict): Response body
+    """
+    if not isinstance(body, dict) or body.get("more_available") is False:
+        return None
+    if endpoint == "get_media_comments":
+        return {"min_id": body["next_min_id"]} if body.get("next_min_id") else None
+    if endpoint == "get_comment_replies":
+        if body.get("has_more_tail_child_comments") is False:
+            return None
+        return {"max_id": body["next_max_child_cursor"]} if body.get("next_max_child_cursor") else None
+    if endpoint in ("get_hashtag_media", "get_location_media"):
+        if not body.get("next_max_id"):
+            return None
+        cursor = {"max_id": body["next_max_id"]}
+        if body.get("next_page") is not None:
+            cursor["page"] = body["next_page"]
+        return cursor
+    if endpoint == "get_user_clips":
+        paging_info = body.get("paging_info") or {}
+        if paging_info.get("more_available") is False or not paging_info.get("max_id"):
+            return None
+        return {"max_id": paging_info["max_id"]}
+    if endpoint == "search_clips":
+        return {"max_id": body["reels_max_id"]} if body.get("reels_max_id") else None
+    if endpoint == "get_thread_replies":
+        _, cursor = thread_replies(body)
+        return {"max_id": cursor} if cursor else None
+    if endpoint == "get_user_tags":
+        cursor = find_key(body, "end_cursor")
+        if not cursor or find_key(body, "has_next_page") is False:
+            return None
+        return {"max_id": cursor}
+    return {"max_id": body["next_max_id"]} if body.get("next_max_id") else None
+
+
+class Task:
+    def __init__(self, key, platform, endpoint, payload, cursor, page, max_pages, attempts, lease_owner, lease_until):
+        """
+        Task of a `SqliteTaskQueue`: one call of a client method.
+
+        Attributes:
+            key (str): Deduplication key
+            platform (str): instagram or threads
+            endpoint (str): Client method name (e.g. "get_user_followers")
+            payload (dict): Method arguments
+            cursor (dict): Pagination arguments (e.g. {"max_id": "..."}), None for the first page
+            page (int): Page number (1 for the first page)
+            max_pages (int): Maximum number of pages to fetch (None for no limit)
+            attempts (int): Number of failed attempts
+        """
+        self.key = key
+        self.platform = platform
+        self.endpoint = endpoint
+        self.payload = payload
+        self.cursor = cursor
+        self.page = page
+        self.max_pages = max_pages
+        self.attempts = attempts
+        self.lease_owner = lease_owner
+        self.lease_until = lease_until
+
+    def __repr__(self):
+        return f"<Task {self.key}>"
+
+
+def _task_key(platform, endpoint, payload, cursor):
+    return json.dumps([platform, endpoint, payload, cursor], sort_keys=True, separators=(",", ":"))
+
+
+class SqliteTaskQueue:
+    _COLUMNS = "key, platform, endpoint, payload, cursor, page, max_pages, attempts, lease_owner, lease_until"
+
+    def __init__(self, path, visibility_timeout=300, max_attempts=5, wal=False):
+        """
+        Shared task queue backed by a sqlite database, for workers running in many processes (or on many nodes with shared storage).
+
+        Tasks are deduplicated by key. A leased task is invisible to other workers until its lease expires
+        (`visibility_timeout` seconds, renewable with `extend`), so the tasks of dead workers are picked up again.
+        Completing a paginated task enqueues the task of its next page in the same transaction.
+
+        By default the database uses the rollback journal, which works on shared storage as long as the network file system
+        implements POSIX locks correctly. WAL mode (`wal=True`) is faster but keeps its index in shared memory,
+        so it only works when all workers run on the same host.
+
+        Args:
+            path (str): Path of the sqlite database
+            visibility_timeout (float): Lease duration in seconds
+            max_attempts (int): Number of attempts after which a failing task is marked as failed
+            wal (bool): Use WAL mode (single host only)
+        """
+        self.path = path
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self._db.execute(f"PRAGMA journal_mode={'WAL' if wal else 'DELETE'}")
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS tasks (
+                key TEXT PRIMARY KEY,
+                platform TEXT NOT NULL,
+                endpoint TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                cursor TEXT,
+                page INTEGER NOT NULL DEFAULT 1,
+                max_pages INTEGER,
+                state TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                lease_owner TEXT,
+                lease_until REAL,
+                error TEXT,
+                updated_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS tasks_state ON tasks (state, lease_until);
+            """
+        )
+
+    def _transaction(self, fn, *args):
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(*args)
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+            return result
+
+    def _insert(self, platform, endpoint, payload, cursor, page, max_pages, key):
+        if key is None:
+            key = _task_key(platform, endpoint, payload, cursor)
+        inserted = self._db.execute(
+            "INSERT OR IGNORE INTO tasks (key, platform, endpoint, payload, cursor, page, max_pages, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                key,
+                platform,
+                endpoint,
+                json.dumps(payload, sort_keys=True),
+                json.dumps(cursor) if cursor is not None else None,
+                page,
+                max_pages,
+                time.time(),
+            ),
+        ).rowcount
+        return bool(inserted)
+
+    def put(self, endpoint, payload, platform="instagram", cursor=None, max_pages=None, key=None):
+        """
+        Add a task, unless a task with the same key already exists.
+
+        Args:
+            endpoint (str): Client method name (e.g. "get_user_followers")
+            payload (dict): Method arguments (e.g. {"user_id": 123, "count": 50})
+            platform (str): instagram or threads
+            cursor (dict): Pagination arguments to start from
+            max_pages (int): Maximum number of pages to fetch (default: no limit)
+            key (str): Deduplication key (default: derived from platform, endpoint, payload and cursor)
+
+        Returns True if the task was added.
+        """
+        return self._transaction(self._insert, platform, endpoint, payload, cursor, 1, max_pages, key)
+
+    def lease(self, worker_id, count=1):
+        """
+        Lease up to `count` pending tasks (or tasks whose lease has expired).
+
+        Args:
+            worker_id (str): Worker id
+            count (int): Maximum number of tasks
+        """
+
+        def lease():
+            now = time.time()
+            rows = self._db.execute(
+                f"SELECT {self._COLUMNS} FROM tasks "
+                "WHERE state = 'pending' OR (state = 'leased' AND lease_until < ?) "
+                "ORDER BY updated_at LIMIT ?",
+                (now, count),
+            ).fetchall()
+            lease_until = now + self.visibility_timeout
+            for row in rows:
+                self._db.execute(
+                    "UPDATE tasks SET state = 'leased', lease_owner = ?, lease_until = ?, updated_at = ? WHERE key = ?",
+                    (worker_id, lease_until, now, row[0]),
+                )
+            return [
+                Task(
+                    key,
+                    platform,
+                    endpoint,
+                    json.loads(payload),
+                    json.loads(cursor) if cursor is not None else None,
+                    page,
+                    max_pages,
+                    attempts,
+                    worker_id,
+                    lease_until,
+                )
+                for key, platform, endpoint, payload, cursor, page, max_pages, attempts, _, _ in rows
+            ]
+
+        return self._transaction(lease)
+
+    def _owned(self, task):
+        row = self._db.execute(
+            "SELECT 1 FROM tasks WHERE key = ? AND state = 'leased' AND lease_owner = ?",
+            (task.key, task.lease_owner),
+        ).fetchone()
+        return row is not None
+
+    def extend(self, task):
+        """Renew the lease of a task. Returns False if the lease was lost."""
+
+        def extend():
+            if not self._owned(task):
+                return False
+            task.lease_until = time.time() + self.visibility_timeout
+            self._db.execute("UPDATE tasks SET lease_until = ? WHERE key = ?", (task.lease_until, task.key))
+            return True
+
+        return self._transaction(extend)
+
+    def complete(self, task, cursor=None):
+        """
+        Mark a task as done and, if `cursor` is given (and `max_pages` is not reached), enqueue its next page.
+
+        Returns False if the lease was lost (the task may have been done by another worker).
+        """
+
+        def complete():
+            if not self._owned(task):
+                return False
+            self._db.execute(
+                "UPDATE tasks SET state = 'done', lease_owner = NULL, lease_until = NULL, updated_at = ? WHERE key = ?",
+                (time.time(), task.key),
+            )
+            if cursor is not None and (task.max_pages is None or task.page < task.max_pages):
+                self._insert(task.platform, task.endpoint, task.payload, cursor, task.page + 1, task.max_pages, None)
+            return True
+
+        return self._transaction(complete)
+
+    def fail(self, task, error, retry=True):
+        """
+        Release a failed task: it is leased again later, or marked as failed after `max_attempts` attempts (or if `retry` is False).
+        """
+
+        def fail():
+            if not self._owned(task):
+                return False
+            state = "pending" if retry and task.attempts + 1 < self.max_attempts else "failed"
+            self._db.execute(
+                "UPDATE tasks SET state = ?, attempts = attempts + 1, error = ?, lease_owner = NULL, lease_until = NULL, "
+                "updated_at = ? WHERE key = ?",
+                (state, repr(error), time.time(), task.key),
+            )
+            return True
+
+        return self._transaction(fail)
+
+    def stats(self):
+        """Return the number of tasks per state (pending, leased, done, failed)."""
+        with self._lock:
+            rows = self._db.execute("SELECT state, COUNT(*) FROM tasks GROUP BY state").fetchall()
+        return dict(rows)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class Worker:
+    def __init__(self, queue, clients, handler, worker_id=None, batch_size=1, poll_interval=1.0):
+        """
+        Executes the tasks of a shared queue with `InstagramAPI`/`ThreadsAPI` clients.
+
+        Every task calls `getattr(client, task.endpoint)(**task.payload, **task.cursor)`, passes the response body to
+        `handler(task, body)`, then completes the task (enqueuing its next page). Failed tasks are retried by any worker,
+        except not found resources.
+
+        Requests run in the context the worker was created in, so a worker created inside
+        `with scheduler.job(...)` keeps that job and priority even when `run` is called from another thread.
+
+        Args:
+            queue (SqliteTaskQueue): Shared queue
+            clients (dict): Clients keyed by platform, e.g. {"instagram": InstagramAPI(token)}
+            handler (callable): Called with (task, body) for every fetched page
+            worker_id (str): Worker id (default: hostname, process id and a random suffix)
+            batch_size (int): Number of tasks leased at once (the leases of the waiting tasks are renewed as needed)
+            poll_interval (float): Seconds to wait when the queue is empty
+        """
+        self.queue = queue
+        self.clients = clients
+        self.handler = handler
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._stopped = False
+        self._context = contextvars.copy_context()
+
+    def stop(self):
+        self._stopped = True
+
+    def run_task(self, task):
+        try:
+            method = getattr(self.clients[task.platform], task.endpoint)
+            body = self._context.copy().run(method, **task.payload, **(task.cursor or {}))
+            self.handler(task, body)
+        except NotFoundException as e:
+            self.queue.fail(task, e, retry=False)
+            return False
+        except Exception as e:
+            self.queue.fail(task, e)
+            return False
+        return self.queue.complete(task, next_cursor(task.endpoint, body))
+
+    def run(self, until_empty=False):
+        """
+        Process tasks until `stop` is called (or, with `until_empty`, until no task can be leased).
+        """
+        while not self._stopped:
+            tasks = self.queue.lease(self.worker_id, self.batch_size)
+            if not tasks:
+                if until_empty:
+                    return
+                time.sleep(self.poll_interval)
+                continue
+            while tasks:
+                if tasks[0].lease_until - time.time() < self.queue.visibility_timeout / 2:
+                    # The tasks of a batch share one lease: renew the remaining ones, dropping those already lost
+                    tasks = [task for task in tasks if self.queue.extend(task)]
+                    if not tasks:
+                        break
+                self.run_task(tasks.pop(0))
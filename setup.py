@@ -10,5 +10,6 @@ setuptools.setup(
     packages=["rocketapi"],
     url="https://github.com/rocketapi-io/rocketapi-python",
     download_url="https://github.com/rocketapi-io/rocketapi-python/archive/refs/tags/v1.0.12.tar.gz",
-    install_requires=["requests"],
+    install_requires=[],
+    extras_require={"requests": ["requests"]},
 )